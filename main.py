@@ -1,23 +1,28 @@
 import gradio as gr
 import pandas as pd
 import os
-import speech_recognition as sr
-from datetime import datetime
-from reportlab.lib.pagesizes import letter, landscape
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
-from sklearn.linear_model import LinearRegression
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend for Render
-import matplotlib.pyplot as plt
+import csv
+import atexit
+import signal
+import sys
+import threading
+import queue
+import time
+import uuid
+import re
+import hashlib
+from io import BytesIO
+from collections import defaultdict
+from functools import wraps
 import numpy as np
 
 # -------------------------------
 # Global Data and Configurations
 # -------------------------------
-inventory = {}
+INVENTORY_DTYPES = {'Price': np.float64, 'Category': 'category', 'Stock': np.int32}
+TRANSACTIONS_DTYPES = {'Action': str, 'Product Name': str, 'Quantity': np.int32, 'User': str, 'Timestamp': str}
+SALES_DTYPES = {'Product Name': str, 'Quantity': np.int32, 'Sale Timestamp': str}
+inventory_df = pd.DataFrame(columns=['Price', 'Category', 'Stock'], index=pd.Index([], name='Product Name')).astype(INVENTORY_DTYPES)
 transactions = []
 sales = []
 admin_credentials = {"harsh": "harsh"}
@@ -28,32 +33,245 @@ INVENTORY_CSV = "inventory.csv"
 TRANSACTIONS_CSV = "transactions.csv"
 SALES_CSV = "sales.csv"
 INVENTORY_PDF = "inventory_report.pdf"
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+_ts_cache = (0, '')
+
+# Cached DataFrame views of `inventory_df`, rebuilt only after a mutation
+_inv_df_cache = None
+_inv_query_cache = {}
+_category_lc = None
+_sorted_cache = {}
+_stocks_sorted = None
+# Held by every mutation and every cache fill, so readers never see a half-applied
+# change and never store results computed from a frame that was replaced under them
+_inventory_state_lock = threading.RLock()
+
+# Deferred inventory writes and append handles for the log CSVs
+_inventory_dirty = False
+_inventory_flush_timer = None
+_inventory_lock = threading.RLock()
+_tx_file = None
+_sales_file = None
+
+# Log rows are queued by the handlers and written in batches by one thread
+LOG_FLUSH_INTERVAL = 0.1
+_log_queue = queue.SimpleQueue()
+_log_thread = None
+_LOG_STOP = object()
+
+# Dropdown choices, kept in step with inventory_df by the CRUD operations
+_product_names = []
+_categories = set()
+
+# Sales rows grouped by product, so a forecast only touches its own history
+_sales_by_product = defaultdict(list)
+
+# Background speech listener, started on first use
+VOICE_SEARCH_TIMEOUT = 5
+_stop_listening = None
+_listen_lock = threading.Lock()
+_phrases = queue.Queue()
+_voice_waiting = threading.Event()
+
+# Rendered forecasts keyed by (product, periods, number of sales for that product)
+_pred_cache = {}
+
+# Long-lived figures for the report chart and the sales forecast; redrawing
+# them is much cheaper than building a new Figure per request. matplotlib,
+# reportlab and speech_recognition are imported on first use to keep startup fast.
+_plt = None
+_figures = {}
+_plot_lock = threading.Lock()
 
 # -------------------------------
 # Data Loading and Saving Methods
 # -------------------------------
 def load_data():
-    global inventory, transactions, sales
+    global inventory_df, transactions, sales
     try:
-        inventory_df = pd.read_csv(INVENTORY_CSV)
-        inventory = {row['Product Name']: {'Price': row['Price'], 'Category': row['Category'], 'Stock': row['Stock']} for _, row in inventory_df.iterrows()}
+        inventory_df = pd.read_csv(INVENTORY_CSV, index_col='Product Name', dtype=INVENTORY_DTYPES, engine='c', low_memory=False)
     except FileNotFoundError:
-        inventory = {}
-        pd.DataFrame(columns=['Product Name', 'Price', 'Category', 'Stock']).to_csv(INVENTORY_CSV, index=False)
+        inventory_df = pd.DataFrame(columns=['Price', 'Category', 'Stock'], index=pd.Index([], name='Product Name')).astype(INVENTORY_DTYPES)
+        _atomic_write_csv(pd.DataFrame(columns=['Product Name', 'Price', 'Category', 'Stock']), INVENTORY_CSV, index=False)
     
     try:
-        transactions_df = pd.read_csv(TRANSACTIONS_CSV)
-        transactions = [tuple(x) for x in transactions_df.values]
+        transactions_df = pd.read_csv(TRANSACTIONS_CSV, dtype=TRANSACTIONS_DTYPES, engine='c', low_memory=False)
+        transactions = list(transactions_df.itertuples(index=False, name=None))
     except FileNotFoundError:
         transactions = []
-        pd.DataFrame(columns=["Transaction ID", "Action", "Product Name", "Quantity", "User", "Timestamp"]).to_csv(TRANSACTIONS_CSV, index=False)
+        _atomic_write_csv(pd.DataFrame(columns=["Transaction ID", "Action", "Product Name", "Quantity", "User", "Timestamp"]), TRANSACTIONS_CSV, index=False)
 
     try:
-        sales_df = pd.read_csv(SALES_CSV)
-        sales = [tuple(x) for x in sales_df.values]
+        sales_df = pd.read_csv(SALES_CSV, dtype=SALES_DTYPES, engine='c', low_memory=False)
+        sales = list(sales_df.itertuples(index=False, name=None))
     except FileNotFoundError:
         sales = []
-        pd.DataFrame(columns=["Sale ID", "Product Name", "Quantity", "Sale Timestamp"]).to_csv(SALES_CSV, index=False)
+        _atomic_write_csv(pd.DataFrame(columns=["Sale ID", "Product Name", "Quantity", "Sale Timestamp"]), SALES_CSV, index=False)
+
+    _index_choices()
+    _index_sales()
+
+def _temp_path_for(path):
+    # A unique temp file beside `path`, so concurrent writers never share one and
+    # os.replace stays on the same filesystem. Created with open(..., 'x') rather
+    # than mkstemp so it gets the usual umask permissions, not 0600.
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    open(tmp, 'x').close()
+    return tmp
+
+def _atomic_write_csv(df, path, **kwargs):
+    # Readers see either the old file or the new one, never a half-written one
+    tmp = _temp_path_for(path)
+    try:
+        with open(tmp, 'w', newline='', buffering=1 << 20) as fh:
+            df.to_csv(fh, **kwargs)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+def save_inventory():
+    # Debounced: a burst of edits is written out once, a second after the last one
+    global _inventory_dirty, _inventory_flush_timer
+    with _inventory_lock:
+        _inventory_dirty = True
+        if _inventory_flush_timer is not None:
+            _inventory_flush_timer.cancel()
+        _inventory_flush_timer = threading.Timer(1.0, _flush_inventory)
+        _inventory_flush_timer.daemon = True
+        _inventory_flush_timer.start()
+
+def _flush_inventory():
+    global _inventory_dirty, _inventory_flush_timer
+    with _inventory_lock:
+        if _inventory_flush_timer is not None:
+            _inventory_flush_timer.cancel()
+            _inventory_flush_timer = None
+        if not _inventory_dirty:
+            return
+        _inventory_dirty = False
+        _atomic_write_csv(inventory_df, INVENTORY_CSV)
+
+def _open_append(path):
+    # Make sure a new row never gets glued onto a last line without a newline
+    needs_newline = False
+    with open(path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) > 0:
+            f.seek(-1, os.SEEK_END)
+            needs_newline = f.read(1) != b'\n'
+    fh = open(path, 'a', newline='', buffering=1 << 16)
+    if needs_newline:
+        fh.write('\n')
+    return fh
+
+def _open_log_files():
+    global _tx_file, _sales_file, _log_thread
+    _tx_file = _open_append(TRANSACTIONS_CSV)
+    _sales_file = _open_append(SALES_CSV)
+    _log_thread = threading.Thread(target=_log_writer, name="log-writer", daemon=True)
+    _log_thread.start()
+    atexit.register(_stop_log_writer)
+
+def _append_row(fh, row):
+    _log_queue.put((fh, row))
+
+def _write_log_batch(batch):
+    rows_by_file = defaultdict(list)
+    for fh, row in batch:
+        rows_by_file[fh].append(row)
+    for fh, rows in rows_by_file.items():
+        csv.writer(fh, lineterminator='\n').writerows(rows)
+        fh.flush()
+
+def _stop_log_writer():
+    # The writer sees the sentinel after everything queued before it, including rows
+    # it had already dequeued, so joining it guarantees they are on disk
+    if _log_thread is None or not _log_thread.is_alive():
+        return
+    _log_queue.put(_LOG_STOP)
+    _log_thread.join(timeout=10)
+
+def _log_writer():
+    while True:
+        batch = [_log_queue.get()]
+        try:
+            while True:
+                batch.append(_log_queue.get_nowait())
+        except queue.Empty:
+            pass
+        stopping = any(item is _LOG_STOP for item in batch)
+        rows = [item for item in batch if item is not _LOG_STOP]
+        try:
+            _write_log_batch(rows)
+        except Exception as e:
+            # Keep the writer alive; later rows may still succeed
+            print(f"Could not write {len(rows)} log rows: {e}")
+        if stopping:
+            return
+        # Let the next burst of rows accumulate before writing again
+        time.sleep(LOG_FLUSH_INTERVAL)
+
+# -------------------------------
+# Inventory View Cache
+# -------------------------------
+def _rebuild_inventory_df():
+    global _inv_df_cache
+    _inv_df_cache = inventory_df.reset_index()
+    return _inv_df_cache
+
+def _get_category_lc():
+    # Lowercased category labels, positionally aligned with Category's codes
+    global _category_lc
+    if _category_lc is None:
+        _category_lc = inventory_df['Category'].cat.categories.astype(str).str.lower()
+    return _category_lc
+
+def _add_category(category):
+    if category not in inventory_df['Category'].cat.categories:
+        inventory_df['Category'] = inventory_df['Category'].cat.add_categories([category])
+
+def _parse_product_fields(price, category, stock):
+    # Returns (price, category, stock) ready for the typed columns, or None if a field is missing
+    if price is None or stock is None or not category:
+        return None
+    try:
+        return float(price), str(category), int(stock)
+    except (TypeError, ValueError):
+        return None
+
+def _restore_inventory_dtypes():
+    # Row enlargement through .loc upcasts every column back to float64/int64/object
+    global inventory_df
+    inventory_df = inventory_df.astype(INVENTORY_DTYPES)
+
+def _index_choices():
+    global _product_names, _categories
+    _product_names = list(inventory_df.index)
+    _categories = set(inventory_df['Category'])
+
+def _discard_category_if_unused(category):
+    if not (inventory_df['Category'] == category).any():
+        _categories.discard(category)
+
+def _index_sales():
+    _sales_by_product.clear()
+    for sale in sales:
+        _sales_by_product[sale[1]].append(sale)
+
+def _synchronized(func):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with _inventory_state_lock:
+            return func(*args, **kwargs)
+    return wrapper
+
+def _invalidate_inventory_cache():
+    global _inv_df_cache, _category_lc, _stocks_sorted
+    _inv_df_cache = None
+    _category_lc = None
+    _inv_query_cache.clear()
+    _sorted_cache.clear()
+    _stocks_sorted = None
 
 # -------------------------------
 # Authentication Methods
@@ -85,167 +303,290 @@ def is_logged_in():
 # -------------------------------
 # CRUD Operations for Inventory
 # -------------------------------
+@_synchronized
 def add_product(product_name, price, category, stock):
     if not is_logged_in():
         return "Please login to perform this action"
     if not is_admin():
         return "Admin access required"
-    if product_name in inventory:
+    if product_name in inventory_df.index:
         return "Product already exists"
-    inventory[product_name] = {'Price': price, 'Category': category, 'Stock': stock}
+    fields = _parse_product_fields(price, category, stock)
+    if fields is None:
+        return "Price, category and stock are required"
+    price, category, stock = fields
+    _add_category(category)
+    inventory_df.loc[product_name] = [price, category, stock]
+    _restore_inventory_dtypes()
+    _product_names.append(product_name)
+    _categories.add(category)
     save_inventory()
     log_transaction("Add", product_name, stock)
+    _invalidate_inventory_cache()
     return f"Product '{product_name}' added successfully."
 
+@_synchronized
 def update_product(product_name, price, category, stock):
     if not is_logged_in():
         return "Please login to perform this action"
     if not is_admin():
         return "Admin access required"
-    if product_name not in inventory:
+    if product_name not in inventory_df.index:
         return "Product not found"
-    inventory[product_name] = {'Price': price, 'Category': category, 'Stock': stock}
+    fields = _parse_product_fields(price, category, stock)
+    if fields is None:
+        return "Price, category and stock are required"
+    price, category, stock = fields
+    old_category = inventory_df.at[product_name, 'Category']
+    _add_category(category)
+    inventory_df.loc[product_name] = [price, category, stock]
+    _restore_inventory_dtypes()
+    _categories.add(category)
+    _discard_category_if_unused(old_category)
     save_inventory()
     log_transaction("Update", product_name, stock)
+    _invalidate_inventory_cache()
     return f"Product '{product_name}' updated successfully."
 
+@_synchronized
 def delete_product(product_name):
     if not is_logged_in():
         return "Please login to perform this action"
     if not is_admin():
         return "Admin access required"
-    if product_name not in inventory:
+    if product_name not in inventory_df.index:
         return "Product not found"
-    del inventory[product_name]
+    old_category = inventory_df.at[product_name, 'Category']
+    inventory_df.drop(product_name, inplace=True)
+    inventory_df['Category'] = inventory_df['Category'].cat.remove_unused_categories()
+    _product_names.remove(product_name)
+    _discard_category_if_unused(old_category)
     save_inventory()
     log_transaction("Delete", product_name, 0)
+    _invalidate_inventory_cache()
     return f"Product '{product_name}' deleted successfully."
 
+@_synchronized
 def view_inventory():
     if not is_logged_in():
         return "Please login to view the inventory"
-    df = pd.DataFrame.from_dict(inventory, orient='index')
-    df.reset_index(inplace=True)
-    df.columns = ['Product Name', 'Price', 'Category', 'Stock']
-    return df
+    return _inv_df_cache if _inv_df_cache is not None else _rebuild_inventory_df()
 
 # -------------------------------
 # Search and Filter
 # -------------------------------
+@_synchronized
 def search_products_by_category(category=None):
     if not is_logged_in():
         return "Please login to search products"
-    filtered_inventory = inventory
+    key = ('search_products_by_category', category)
+    if key in _inv_query_cache:
+        return _inv_query_cache[key]
     if category:
-        filtered_inventory = {k: v for k, v in filtered_inventory.items() if category.lower() in v['Category'].lower()}
-    df = pd.DataFrame.from_dict(filtered_inventory, orient='index')
-    df.reset_index(inplace=True)
-    df.columns = ['Product Name', 'Price', 'Category', 'Stock']
+        # Match against the handful of distinct labels, then select rows by code
+        matching_codes = np.flatnonzero(_get_category_lc().str.contains(category.lower(), regex=False))
+        mask = inventory_df['Category'].cat.codes.isin(matching_codes)
+        df = inventory_df.loc[mask].reset_index()
+    else:
+        df = view_inventory()
+    _inv_query_cache[key] = df
     return df
 
 # Voice recognition for search
+def _on_phrase(recognizer, audio):
+    # Runs on the listener thread, so the STT round-trip never blocks a request
+    # Nothing is sent to the STT service unless a voice_search call is waiting
+    if not _voice_waiting.is_set():
+        return
+    captured_at = time.monotonic()
+    import speech_recognition as sr
+    try:
+        category = recognizer.recognize_google(audio)
+        print(f"Recognized: {category}")
+        _phrases.put((captured_at, category))
+    except sr.UnknownValueError:
+        _phrases.put((captured_at, "Could not understand audio"))
+    except sr.RequestError as e:
+        _phrases.put((captured_at, f"Could not request results; {e}"))
+
+def _start_listening():
+    global _stop_listening
+    with _listen_lock:
+        if _stop_listening is not None:
+            return
+        import speech_recognition as sr
+        recognizer = sr.Recognizer()
+        recognizer.energy_threshold = 300
+        recognizer.dynamic_energy_threshold = False
+        _stop_listening = recognizer.listen_in_background(sr.Microphone(), _on_phrase)
+        atexit.register(_stop_listening, wait_for_stop=False)
+        print("Listening...")
+
 def voice_search():
     if not is_logged_in():
         return "Please login to use voice search"
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("Listening...")
-        audio = recognizer.listen(source)
-        try:
-            category = recognizer.recognize_google(audio)
-            print(f"Recognized: {category}")
-            return category
-        except sr.UnknownValueError:
-            return "Could not understand audio"
-        except sr.RequestError as e:
-            return f"Could not request results; {e}"
+    _start_listening()
+    requested_at = time.monotonic()
+    deadline = requested_at + VOICE_SEARCH_TIMEOUT
+    _voice_waiting.set()
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return "No speech detected"
+            try:
+                captured_at, text = _phrases.get(timeout=remaining)
+            except queue.Empty:
+                return "No speech detected"
+            # Skip phrases that were captured before this click
+            if captured_at >= requested_at:
+                return text
+    finally:
+        _voice_waiting.clear()
 
 # -------------------------------
 # Stock Management
 # -------------------------------
+@_synchronized
 def low_stock_alerts(threshold=10):
+    global _stocks_sorted
     if not is_logged_in():
         return "Please login to view low stock alerts"
-    low_stock_items = {product: details for product, details in inventory.items() if details['Stock'] <= threshold}
-    df = pd.DataFrame.from_dict(low_stock_items, orient='index')
-    df.reset_index(inplace=True)
-    df.columns = ['Product Name', 'Price', 'Category', 'Stock']
+    key = ('low_stock_alerts', threshold)
+    if key in _inv_query_cache:
+        return _inv_query_cache[key]
+    # Items at or under the threshold are a prefix of the stock-sorted order
+    positions = _get_sorted('Stock')
+    if _stocks_sorted is None:
+        _stocks_sorted = inventory_df['Stock'].to_numpy()[positions]
+    k = np.searchsorted(_stocks_sorted, threshold, side='right')
+    df = inventory_df.iloc[positions[:k]].reset_index()
+    _inv_query_cache[key] = df
     return df
 
 # -------------------------------
 # Bulk Export
 # -------------------------------
+def _get_figure(name):
+    # Callers hold _plot_lock
+    global _plt
+    if _plt is None:
+        import matplotlib
+        matplotlib.use('Agg')  # Use non-interactive backend for Render
+        import matplotlib.pyplot as plt
+        _plt = plt
+    if name not in _figures:
+        _figures[name] = _plt.subplots(figsize=(10, 6))
+    return _figures[name]
+
 def export_inventory():
     if not is_logged_in():
         return "Please login to export the inventory"
+    _flush_inventory()
     return INVENTORY_CSV
 
 def export_inventory_pdf():
     if not is_logged_in():
         return "Please login to export the inventory"
-    df = pd.DataFrame.from_dict(inventory, orient='index')
-    df.reset_index(inplace=True)
-    df.columns = ['Product Name', 'Price', 'Category', 'Stock']
-
-    fig, ax = plt.subplots(figsize=(10, 6))
-    df['Stock'].plot(kind='bar', ax=ax)
-    ax.set_title('Stock Levels by Product')
-    ax.set_xlabel('Product')
-    ax.set_ylabel('Stock')
-    plt.xticks(ticks=range(len(df)), labels=df['Product Name'], rotation=90)
-    plt.tight_layout()
-    plt.savefig('stock_levels.png')
-    plt.close(fig)
-
-    c = canvas.Canvas(INVENTORY_PDF, pagesize=landscape(letter))
-    width, height = landscape(letter)
-    c.drawString(30, height - 40, "Inventory Report")
-    c.drawString(30, height - 60, f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    
-    # Table Header
-    c.drawString(30, height - 100, "Product Name")
-    c.drawString(200, height - 100, "Price")
-    c.drawString(300, height - 100, "Category")
-    c.drawString(400, height - 100, "Stock")
-    
-    y = height - 120
-    for index, row in df.iterrows():
-        c.drawString(30, y, str(row['Product Name']))
-        c.drawString(200, y, f"${row['Price']:.2f}")
-        c.drawString(300, y, str(row['Category']))
-        c.drawString(400, y, str(row['Stock']))
-        y -= 20
-        if y < 40:
-            c.showPage()
-            y = height - 40
-
-    c.drawImage('stock_levels.png', 30, y - 300, width - 60, 300)
-    c.showPage()
-    
-    c.save()
-    os.remove('stock_levels.png')
+    from reportlab.lib.pagesizes import letter, landscape
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
+    df = view_inventory()
+
+    chart = BytesIO()
+    with _plot_lock:
+        fig, ax = _get_figure('export')
+        ax.clear()
+        df['Stock'].plot(kind='bar', ax=ax)
+        ax.set_title('Stock Levels by Product')
+        ax.set_xlabel('Product')
+        ax.set_ylabel('Stock')
+        ax.set_xticks(range(len(df)), labels=df['Product Name'], rotation=90)
+        fig.tight_layout()
+        fig.savefig(chart, format='png', dpi=100)
+    chart.seek(0)
+
+    styles = getSampleStyleSheet()
+
+    # One Table flowable for all rows; repeatRows carries the header onto each page
+    rows = df.assign(Price=df['Price'].map('${:.2f}'.format)).astype(str).values.tolist()
+    data = [['Product Name', 'Price', 'Category', 'Stock']] + rows
+    tbl = Table(data, repeatRows=1, colWidths=[2 * inch] * 4, hAlign='LEFT')
+    tbl.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.black),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ]))
+
+    tmp_pdf = _temp_path_for(INVENTORY_PDF)
+    try:
+        doc = SimpleDocTemplate(tmp_pdf, pagesize=landscape(letter),
+                                leftMargin=30, rightMargin=30, topMargin=30, bottomMargin=40)
+        doc.build([
+            Paragraph("Inventory Report", styles['Heading1']),
+            Paragraph(f"Generated on: {_now_str()}", styles['Normal']),
+            Spacer(1, 20),
+            tbl,
+            Spacer(1, 20),
+            Image(chart, width=doc.width, height=300),
+        ])
+        os.replace(tmp_pdf, INVENTORY_PDF)
+    except BaseException:
+        os.remove(tmp_pdf)
+        raise
     return INVENTORY_PDF
 
 # -------------------------------
 # Product Sorting
 # -------------------------------
+def _get_sorted(col):
+    # Ascending row positions for a column, reused until the next mutation
+    positions = _sorted_cache.get(col)
+    if positions is None:
+        if col == 'Product Name':
+            positions = inventory_df.index.argsort(kind='stable')
+        elif col == 'Category':
+            # Category codes follow insertion order once new categories are added, so sort the labels
+            positions = inventory_df['Category'].astype(str).argsort(kind='stable').to_numpy()
+        else:
+            positions = inventory_df[col].argsort(kind='stable').to_numpy()
+        _sorted_cache[col] = positions
+    return positions
+
+@_synchronized
 def sort_inventory(by, order):
     if not is_logged_in():
         return "Please login to sort the inventory"
-    df = pd.DataFrame.from_dict(inventory, orient='index')
-    df.reset_index(inplace=True)
-    df.columns = ['Product Name', 'Price', 'Category', 'Stock']
-    if by in df.columns:
-        df.sort_values(by=by, ascending=(order == 'asc'), inplace=True)
+    key = ('sort_inventory', by, order)
+    if key in _inv_query_cache:
+        return _inv_query_cache[key]
+    if by in ('Product Name', 'Price', 'Category', 'Stock'):
+        positions = _get_sorted(by)
+        if order != 'asc':
+            positions = positions[::-1]
+        df = inventory_df.iloc[positions].reset_index()
+    else:
+        df = view_inventory()
+    _inv_query_cache[key] = df
     return df
 
 # -------------------------------
 # Transaction History
 # -------------------------------
+def _now_str():
+    # strftime only runs once per wall-clock second
+    global _ts_cache
+    t = int(time.time())
+    if t != _ts_cache[0]:
+        _ts_cache = (t, time.strftime(TIMESTAMP_FORMAT, time.localtime(t)))
+    return _ts_cache[1]
+
 def log_transaction(action, product_name, quantity):
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    transactions.append((len(transactions)+1, action, product_name, quantity, logged_in_user, timestamp))
-    save_transactions()
+    timestamp = _now_str()
+    row = (len(transactions)+1, action, product_name, quantity, logged_in_user, timestamp)
+    transactions.append(row)
+    _append_row(_tx_file, row)
 
 def view_transactions():
     if not is_logged_in():
@@ -256,69 +597,95 @@ def view_transactions():
 # -------------------------------
 # Sales Management
 # -------------------------------
+@_synchronized
 def sale_product(product_name, quantity):
     if not is_logged_in():
         return "Please login to perform this action"
-    if product_name not in inventory:
+    if product_name not in inventory_df.index:
         return "Product not found"
-    if inventory[product_name]['Stock'] < quantity:
+    if inventory_df.at[product_name, 'Stock'] < quantity:
         return "Insufficient stock"
     
-    inventory[product_name]['Stock'] -= quantity
+    inventory_df.at[product_name, 'Stock'] -= quantity
     save_inventory()
     sale_id = len(sales) + 1
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    timestamp = _now_str()
     sales.append((sale_id, product_name, quantity, timestamp))
-    save_sales()
+    _sales_by_product[product_name].append(sales[-1])
+    _append_row(_sales_file, sales[-1])
+    _invalidate_inventory_cache()
     return f"Sold {quantity} of '{product_name}'"
 
-def save_sales():
-    sales_df = pd.DataFrame(sales, columns=["Sale ID", "Product Name", "Quantity", "Sale Timestamp"])
-    sales_df.to_csv(SALES_CSV, index=False)
-
 # -------------------------------
 # Sales Prediction
 # -------------------------------
+def _prediction_filename(product_name, periods):
+    # Stable across restarts so each product/horizon overwrites one file; the digest
+    # keeps names that sanitize alike (e.g. "a b" and "a_b") apart
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', str(product_name))[:40]
+    digest = hashlib.md5(str(product_name).encode('utf-8')).hexdigest()[:8]
+    return f"pred_{slug}_{digest}_{int(periods)}.png"
+
 def predict_sales(product_name, periods=12):
     if not is_logged_in():
         return "Please login to perform this action"
-    sales_df = pd.DataFrame(sales, columns=["Sale ID", "Product Name", "Quantity", "Sale Timestamp"])
-    sales_df['Sale Timestamp'] = pd.to_datetime(sales_df['Sale Timestamp'])
-    sales_df = sales_df[sales_df['Product Name'] == product_name]
-    sales_df = sales_df.set_index('Sale Timestamp').resample('M').sum().fillna(0)
-    
-    sales_df.reset_index(inplace=True)
-    sales_df['Month'] = sales_df['Sale Timestamp'].dt.month
-    sales_df['Year'] = sales_df['Sale Timestamp'].dt.year
-    sales_df['Time'] = sales_df['Year'] * 12 + sales_df['Month']
-    sales_df['Time'] -= sales_df['Time'].min()
-
-    X = sales_df[['Time']]
-    y = sales_df['Quantity']
-
-    model = LinearRegression()
-    model.fit(X, y)
-
-    future_time = np.arange(sales_df['Time'].max() + 1, sales_df['Time'].max() + periods + 1)
-    future_sales = model.predict(future_time.reshape(-1, 1))
-
-    plt.figure(figsize=(10, 6))
-    plt.plot(sales_df['Sale Timestamp'], sales_df['Quantity'], label='Historical Sales')
-    future_dates = pd.date_range(sales_df['Sale Timestamp'].max(), periods=periods, freq='M')
-    plt.plot(future_dates, future_sales, label='Predicted Sales')
-    plt.xlabel('Date')
-    plt.ylabel('Quantity Sold')
-    plt.title(f'Sales Prediction for {product_name}')
-    plt.legend()
-    plt.grid(True)
-    
-    plt.savefig('sales_prediction.png')
-    return 'sales_prediction.png'
+    key = (product_name, periods, len(_sales_by_product.get(product_name, ())))
+    cached = _pred_cache.get(key)
+    if cached is not None and os.path.exists(cached):
+        return cached
+    sales_df = pd.DataFrame(_sales_by_product.get(product_name, []), columns=["Sale ID", "Product Name", "Quantity", "Sale Timestamp"])
+    quantities = pd.Series(sales_df['Quantity'].to_numpy(), index=pd.to_datetime(sales_df['Sale Timestamp']))
+    monthly = quantities.groupby(pd.Grouper(freq='M')).sum()
+    months = monthly.index.year * 12 + monthly.index.month
+    months -= months.min()
+
+    # Ordinary least squares on a single feature has a closed form
+    x = months.to_numpy(np.float64)
+    y = monthly.to_numpy(np.float64)
+    xm, ym = x.mean(), y.mean()
+    sxx = ((x - xm) ** 2).sum()
+    slope = ((x - xm) * (y - ym)).sum() / sxx if sxx else 0.0
+    intercept = ym - slope * xm
+
+    future_time = np.arange(months.max() + 1, months.max() + periods + 1)
+    future_sales = slope * future_time + intercept
+
+    future_dates = pd.date_range(monthly.index.max(), periods=periods, freq='M')
+    with _plot_lock:
+        fig, ax = _get_figure('predict')
+        ax.clear()
+        ax.plot(monthly.index, monthly.to_numpy(), label='Historical Sales')
+        ax.plot(future_dates, future_sales, label='Predicted Sales')
+        ax.set_xlabel('Date')
+        ax.set_ylabel('Quantity Sold')
+        ax.set_title(f'Sales Prediction for {product_name}')
+        ax.legend()
+        ax.grid(True)
+        filename = _prediction_filename(product_name, periods)
+        fig.savefig(filename)
+
+    # A new sale makes the previous forecast for this product/horizon stale; its
+    # image has the same name and was just overwritten
+    for old_key in [k for k in _pred_cache if k[:2] == key[:2]]:
+        del _pred_cache[old_key]
+    _pred_cache[key] = filename
+    return filename
 
 # -------------------------------
 # Main: Load data and start server
 # -------------------------------
 load_data()
+_open_log_files()
+atexit.register(_flush_inventory)
+
+def _exit_on_sigterm(signum, frame):
+    # Render stops the service with SIGTERM, which skips atexit, so flush here first
+    _flush_inventory()
+    _stop_log_writer()
+    sys.exit(0)
+
+if threading.current_thread() is threading.main_thread():
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
 
 # Gradio Interface
 def login_wrapper(username, password):
@@ -327,6 +694,12 @@ def login_wrapper(username, password):
 def logout_wrapper():
     return logout()
 
+def refresh_product_choices():
+    return gr.update(choices=list(_product_names))
+
+def refresh_category_choices():
+    return gr.update(choices=sorted(_categories))
+
 iface = gr.Blocks()
 
 with iface:
@@ -346,11 +719,11 @@ with iface:
         logout_output = gr.Textbox(label="Output")
         logout_button.click(logout_wrapper, outputs=logout_output)
 
-    with gr.Tab("Sale Product"):
+    with gr.Tab("Sale Product") as sale_tab:
         gr.Markdown("## Sale Product", elem_id="subheader")
-        product_names = list(inventory.keys())
-        sale_product_name = gr.Dropdown(choices=product_names, label="Product Name")
-        sale_quantity = gr.Number(label="Quantity")
+        sale_product_name = gr.Dropdown(choices=list(_product_names), label="Product Name")
+        sale_tab.select(refresh_product_choices, outputs=sale_product_name)
+        sale_quantity = gr.Number(label="Quantity", precision=0)
         sale_button = gr.Button("Sale Product")
         sale_output = gr.Textbox(label="Output")
         sale_button.click(sale_product, inputs=[sale_product_name, sale_quantity], outputs=sale_output)
@@ -366,7 +739,7 @@ with iface:
         product_name = gr.Textbox(label="Product Name")
         price = gr.Number(label="Price")
         category = gr.Textbox(label="Category")
-        stock = gr.Number(label="Stock")
+        stock = gr.Number(label="Stock", precision=0)
         add_button = gr.Button("Add Product")
         add_output = gr.Textbox(label="Output")
         add_button.click(add_product, inputs=[product_name, price, category, stock], outputs=add_output)
@@ -376,7 +749,7 @@ with iface:
         product_name = gr.Textbox(label="Product Name")
         price = gr.Number(label="Price")
         category = gr.Textbox(label="Category")
-        stock = gr.Number(label="Stock")
+        stock = gr.Number(label="Stock", precision=0)
         update_button = gr.Button("Update Product")
         update_output = gr.Textbox(label="Output")
         update_button.click(update_product, inputs=[product_name, price, category, stock], outputs=update_output)
@@ -395,10 +768,10 @@ with iface:
         low_stock_output = gr.DataFrame(label="Low Stock Items")
         low_stock_button.click(low_stock_alerts, inputs=threshold, outputs=low_stock_output)
     
-    with gr.Tab("Search Products"):
+    with gr.Tab("Search Products") as search_tab:
         gr.Markdown("## Search Products", elem_id="subheader")
-        categories = list(set([v['Category'] for v in inventory.values()]))
-        search_category = gr.Dropdown(choices=categories, label="Category")
+        search_category = gr.Dropdown(choices=sorted(_categories), label="Category")
+        search_tab.select(refresh_category_choices, outputs=search_category)
         search_button = gr.Button("Search")
         search_output = gr.DataFrame(label="Search Results")
         search_button.click(search_products_by_category, inputs=search_category, outputs=search_output)
@@ -436,10 +809,10 @@ with iface:
         view_trans_output = gr.DataFrame(label="Transaction History")
         view_trans_button.click(view_transactions, outputs=view_trans_output)
 
-    with gr.Tab("Predict Sales"):
+    with gr.Tab("Predict Sales") as predict_tab:
         gr.Markdown("## Predict Sales", elem_id="subheader")
-        product_names = list(inventory.keys())
-        predict_product_name = gr.Dropdown(choices=product_names, label="Product Name")
+        predict_product_name = gr.Dropdown(choices=list(_product_names), label="Product Name")
+        predict_tab.select(refresh_product_choices, outputs=predict_product_name)
         predict_periods = gr.Number(label="Months to Predict", value=12)
         predict_button = gr.Button("Predict Sales")
         predict_output = gr.Image(label="Sales Prediction")